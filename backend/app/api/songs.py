@@ -5,7 +5,6 @@ from app.database import get_db
 from app.auth import get_current_user, get_current_user_optional, User
 from app.recommendation_engine import recommendation_engine
 from typing import Optional, List
-import math
 
 router = APIRouter(prefix="/songs", tags=["songs"])
 
@@ -25,21 +24,8 @@ def get_songs(
     """
     user_id = current_user.id if current_user else None
     songs, total = crud.get_songs_with_user_ratings(db, user_id, page=page, limit=limit)
-    
-    # Calculate pagination metadata
-    total_pages = math.ceil(total / limit) if total > 0 else 0
-    has_next = page < total_pages
-    has_prev = page > 1
-    
-    return schemas.PaginatedSongs(
-        items=songs,
-        page=page,
-        limit=limit,
-        total=total,
-        pages=total_pages,
-        has_next=has_next,
-        has_prev=has_prev
-    )
+
+    return schemas.PaginatedSongs.create(items=songs, page=page, limit=limit, total=total)
 
 
 # SPECIFIC ROUTES FIRST (before generic /{song_id})
@@ -66,11 +52,7 @@ def get_song_by_title(
     if song:
         # Add user rating if authenticated
         user_id = current_user.id if current_user else None
-        if user_id:
-            user_rating = crud.get_user_song_rating(db, user_id, song.id)
-            song.user_rating = user_rating.rating if user_rating else None
-        else:
-            song.user_rating = None
+        song.user_rating = crud.get_user_rating_value(db, user_id, song.id) if user_id else None
             
         return schemas.SongSearchResponse(
             song=song,
@@ -180,9 +162,8 @@ def rate_song(
     db: Session = Depends(get_db)
 ):
     """Rate a song"""
-    # Check if song exists
-    existing_song = crud.get_song_by_id(db, song_id)
-    if not existing_song:
+    # Existence check only - no need to hydrate the full Song row
+    if not crud.song_exists(db, song_id):
         raise HTTPException(status_code=404, detail="Song not found")
     
     # Create or update rating
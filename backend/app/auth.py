@@ -1,8 +1,10 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError
 from supabase import create_client, Client
 import os
+import time
 from typing import Optional
 from pydantic import BaseModel
 
@@ -19,23 +21,38 @@ class User(BaseModel):
     email: str
     created_at: str
 
+# Cache of already-verified tokens. Verification is pure CPU work
+# (HMAC + JSON decode), so repeat requests with the same bearer token
+# can reuse the decoded payload until the token itself expires.
+_verified_tokens: dict = {}
+_VERIFIED_TOKENS_MAX = 1024
+
 def verify_token(token: str) -> dict:
-    """Verify Supabase JWT token"""
+    """Verify Supabase JWT token (cached until the token expires)"""
+    cached = _verified_tokens.get(token)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
     try:
         payload = jwt.decode(
-            token, 
-            SUPABASE_JWT_SECRET, 
+            token,
+            SUPABASE_JWT_SECRET,
             algorithms=["HS256"],
             options={"verify_aud": False}
         )
-        return payload
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if len(_verified_tokens) >= _VERIFIED_TOKENS_MAX:
+        _verified_tokens.clear()
+    # exp is checked by jwt.decode, so a missing claim means a short cache life
+    _verified_tokens[token] = (payload.get("exp", time.time() + 60), payload)
+    return payload
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Get current authenticated user"""
     payload = verify_token(credentials.credentials)
@@ -65,5 +82,14 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
     except HTTPException:
         return None
 
-# Create supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
\ No newline at end of file
+# Lazy supabase client: building the client spins up an HTTP session,
+# so defer it until something actually needs it and then reuse the one
+# instance (keep-alive connections included) for the process lifetime
+_supabase_client: Optional[Client] = None
+
+def get_supabase() -> Client:
+    """Get the shared supabase client, creating it on first use"""
+    global _supabase_client
+    if _supabase_client is None:
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    return _supabase_client
\ No newline at end of file
@@ -1,10 +1,21 @@
 #SQLAlchemy DB interaction functions
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_, and_, null, exists, case, select, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app import models, schemas
-from typing import List, Optional, Tuple
-from sqlalchemy import func, or_
-import math
+from app.utils.cache import TTLCache
+from typing import Iterable, List, Optional, Tuple
+from itertools import islice
+import csv
+import io
+
+# Short-TTL caches for read-heavy aggregates; writes invalidate the
+# affected keys so callers never see values older than the TTL
+_songs_count_cache = TTLCache(default_ttl=60.0)
+_ratings_breakdown_cache = TTLCache(default_ttl=60.0)
+_rated_song_ids_cache = TTLCache(default_ttl=300.0)
+
+_SONGS_COUNT_KEY = "songs:count"
 
 
 def create_song(db: Session, song: schemas.SongCreate) -> models.Song:  
@@ -13,6 +24,7 @@ def create_song(db: Session, song: schemas.SongCreate) -> models.Song:
     db.add(db_song)
     db.commit()
     db.refresh(db_song)
+    _songs_count_cache.delete(_SONGS_COUNT_KEY)
     return db_song
 
 
@@ -21,15 +33,35 @@ def get_song_by_id(db: Session, song_id: str) -> Optional[models.Song]:
     return db.query(models.Song).filter(models.Song.id == song_id).first()
 
 
+# Title search statement, built once at import; each call only binds the
+# three pattern parameters instead of re-constructing filter expressions
+_TITLE_SEARCH_STMT = (
+    select(models.Song)
+    .where(or_(
+        models.Song.title.ilike(bindparam('exact')),
+        models.Song.title.ilike(bindparam('prefix')),
+        models.Song.title.ilike(bindparam('contains'))
+    ))
+    .order_by(case(
+        (models.Song.title.ilike(bindparam('exact')), 0),   # Exact match first
+        (models.Song.title.ilike(bindparam('prefix')), 1),  # Starts with
+        else_=2                                             # Contains
+    ))
+    .limit(1)
+)
+
+
 def get_song_by_title(db: Session, title: str) -> Optional[models.Song]:
-    """Get a song by its title with simple fuzzy matching"""
-    return db.query(models.Song).filter(
-        or_(
-            func.lower(models.Song.title) == func.lower(title),  # Exact match first
-            models.Song.title.ilike(f"{title}%"),               # Starts with
-            models.Song.title.ilike(f"%{title}%")               # Contains
-        )
-    ).first()
+    """Get a song by its title with simple fuzzy matching
+
+    One indexed query: the ILIKE patterns are served by the pg_trgm GIN
+    index on title (see database.py), and a CASE ranking keeps the
+    exact > starts-with > contains preference without three queries.
+    """
+    return db.execute(
+        _TITLE_SEARCH_STMT,
+        {'exact': title, 'prefix': f"{title}%", 'contains': f"%{title}%"}
+    ).scalars().first()
 
 
 def get_songs(
@@ -43,42 +75,135 @@ def get_songs(
     """
     # Calculate offset/ how many rows to skip
     offset = (page - 1) * limit
-    
-    # Get total count
-    total = db.query(models.Song).count()
-    
-    # Get paginated songs
-    songs = (
-        db.query(models.Song)
+
+    # Single query: page rows plus total count via a window function,
+    # so we don't pay a separate COUNT(*) round trip per page
+    stmt = (
+        select(models.Song, func.count().over().label('total'))
+        .order_by(models.Song.index)
         .offset(offset)
         .limit(limit)
-        .all()
     )
-    
+    rows = db.execute(stmt).all()
+
+    songs = [song for song, _ in rows]
+    # Empty page (past the end): fall back to a plain count
+    total = rows[0][1] if rows else db.scalar(select(func.count()).select_from(models.Song))
+
     return songs, total
 
 
-def bulk_create_songs(db: Session, songs: List[schemas.SongCreate]) -> List[models.Song]:
-    """Bulk create multiple songs"""
-    db_songs = [models.Song(**song.model_dump()) for song in songs]
-    db.add_all(db_songs)
+# Song columns in COPY order: everything except the serial PK and the
+# server-side timestamps, which PostgreSQL fills in itself
+_SONG_COPY_COLUMNS = tuple(
+    column.name for column in models.Song.__table__.columns
+    if column.name not in ('index', 'created_at', 'updated_at')
+)
+
+
+def _bulk_create_songs_copy(db: Session, songs: List[schemas.SongCreate]) -> Tuple[int, List[models.Song]]:
+    """COPY FROM STDIN fast path: one stream instead of N INSERT round-trips"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    db_songs = []
+    for song in songs:
+        song_data = song.model_dump()
+        song_data['average_rating'] = 0.0
+        song_data['rating_count'] = 0
+        writer.writerow([song_data[column] for column in _SONG_COPY_COLUMNS])
+        # Transient ORM objects for the caller; the rows themselves go in via COPY
+        db_songs.append(models.Song(**song_data))
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY songs ({', '.join(_SONG_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
     db.commit()
-    
-    # Refresh all objects to get their IDs
-    for song in db_songs:
-        db.refresh(song)
-    
-    return db_songs
+    # COPY is all-or-nothing: every row landed or the statement raised
+    return len(db_songs), db_songs
+
+
+def _bulk_create_songs_insert(db: Session, songs: List[schemas.SongCreate],
+                              ignore_conflicts: bool = False) -> Tuple[int, List[models.Song]]:
+    """Core executemany: one batched statement, no per-row ORM
+    flush/refresh (column defaults fill average_rating/rating_count).
+    With ignore_conflicts, rows whose id already exists are skipped
+    (ON CONFLICT DO NOTHING / INSERT OR IGNORE) and the returned count
+    reflects only the rows actually inserted."""
+    if ignore_conflicts:
+        if db.get_bind().dialect.name == "postgresql":
+            stmt = pg_insert(models.Song).on_conflict_do_nothing(index_elements=['id'])
+        else:
+            stmt = models.Song.__table__.insert().prefix_with("OR IGNORE")
+    else:
+        stmt = models.Song.__table__.insert()
+
+    song_dicts = [song.model_dump() for song in songs]
+    result = db.execute(stmt, song_dicts)
+    db.commit()
+
+    # rowcount excludes conflict-skipped rows; drivers that can't report
+    # it for executemany return -1, in which case assume the full batch
+    inserted = result.rowcount if result.rowcount >= 0 else len(song_dicts)
+    return inserted, [
+        models.Song(**song_data, average_rating=0.0, rating_count=0)
+        for song_data in song_dicts
+    ]
+
+
+def bulk_create_songs(db: Session, songs: Iterable[schemas.SongCreate],
+                      batch_size: int = 5000, preview: int = 0,
+                      ignore_conflicts: bool = False) -> Tuple[int, List[models.Song]]:
+    """Bulk create multiple songs
+
+    Accepts any iterable (including a generator) and writes it to the
+    database in batches of batch_size, committing per batch, so huge
+    playlists stream through instead of building one giant parameter set.
+    Returns (total_created, preview_rows): only the first `preview`
+    created songs are kept around, so callers printing a sample don't
+    force the whole playlist to stay resident as ORM objects.
+    With ignore_conflicts, already-present song ids are skipped (upsert
+    reruns); COPY can't skip duplicates, so that path goes through the
+    conflict-aware Core insert instead.
+    """
+    if ignore_conflicts:
+        def write_batch(db, batch):
+            return _bulk_create_songs_insert(db, batch, ignore_conflicts=True)
+    elif db.get_bind().dialect.name == "postgresql":
+        write_batch = _bulk_create_songs_copy
+    else:
+        write_batch = _bulk_create_songs_insert
+
+    total = 0
+    preview_rows: List[models.Song] = []
+    songs_iter = iter(songs)
+    while True:
+        batch = list(islice(songs_iter, batch_size))
+        if not batch:
+            break
+        inserted, created = write_batch(db, batch)
+        if len(preview_rows) < preview:
+            preview_rows.extend(created[:preview - len(preview_rows)])
+        total += inserted
+
+    _songs_count_cache.delete(_SONGS_COUNT_KEY)
+    return total, preview_rows
 
 
 def song_exists(db: Session, song_id: str) -> bool:
-    """Check if a song exists by its ID"""
-    return db.query(models.Song).filter(models.Song.id == song_id).first() is not None
+    """Check if a song exists by its ID (EXISTS, no row materialization)"""
+    return db.query(exists().where(models.Song.id == song_id)).scalar()
 
 
 def get_songs_count(db: Session) -> int:
-    """Get total number of songs in the database"""
-    return db.query(models.Song).count()
+    """Get total number of songs in the database (cached, short TTL)"""
+    count = _songs_count_cache.get(_SONGS_COUNT_KEY)
+    if count is None:
+        count = db.query(models.Song).count()
+        _songs_count_cache.set(_SONGS_COUNT_KEY, count)
+    return count
 
 
 # User Rating Functions (Updated for Trigger Support)
@@ -91,30 +216,73 @@ def get_user_song_rating(db: Session, user_id: str, song_id: str) -> Optional[mo
     ).first()
 
 
-def create_or_update_user_rating(db: Session, user_id: str, song_id: str, rating: float) -> models.UserSongRating:
-    """Create or update user's rating for a song (database triggers handle average updates automatically)"""
+def get_user_rating_value(db: Session, user_id: str, song_id: str) -> Optional[float]:
+    """Get just the rating value for a user/song pair.
+
+    Selects only the rating column so the lookup is served from the
+    (user_id, song_id) composite index without loading the full row.
+    """
+    return db.query(models.UserSongRating.rating).filter(
+        models.UserSongRating.user_id == user_id,
+        models.UserSongRating.song_id == song_id
+    ).scalar()
+
+
+def create_or_update_user_rating(db: Session, user_id: str, song_id: str, rating: float,
+                                 commit: bool = True) -> models.UserSongRating:
+    """Create or update user's rating for a song (database triggers handle average updates automatically)
+
+    With commit=False the write is only flushed, letting callers batch
+    several ratings into one commit (the caller commits at the end).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Single round trip: INSERT ... ON CONFLICT DO UPDATE on the
+        # (user_id, song_id) unique index, RETURNING the row, instead of
+        # select-then-insert/update-then-refresh
+        stmt = pg_insert(models.UserSongRating).values(
+            user_id=user_id,
+            song_id=song_id,
+            rating=rating
+        ).on_conflict_do_update(
+            index_elements=['user_id', 'song_id'],
+            set_={'rating': rating, 'updated_at': func.now()}
+        ).returning(models.UserSongRating)
+
+        result = db.execute(
+            stmt, execution_options={"populate_existing": True}
+        ).scalar_one()
+        if commit:
+            db.commit()
+        _ratings_breakdown_cache.delete(song_id)
+        _rated_song_ids_cache.delete(user_id)
+        return result
+
+    # Other dialects (SQLite in tests): keep the portable two-step path
     existing_rating = get_user_song_rating(db, user_id, song_id)
-    
+
     if existing_rating:
         existing_rating.rating = rating
         existing_rating.updated_at = func.now()
-        db.commit()
-        db.refresh(existing_rating)
         result = existing_rating
     else:
-        new_rating = models.UserSongRating(
+        result = models.UserSongRating(
             user_id=user_id,
             song_id=song_id,
             rating=rating
         )
-        db.add(new_rating)
+        db.add(result)
+
+    if commit:
         db.commit()
-        db.refresh(new_rating)
-        result = new_rating
+        db.refresh(result)
+    else:
+        db.flush()
     
     # Note: Database triggers automatically update song's average rating and count
     # No need to manually call update_song_average_rating(db, song_id)
-    
+
+    _ratings_breakdown_cache.delete(song_id)
+    _rated_song_ids_cache.delete(user_id)
     return result
 
 
@@ -124,31 +292,39 @@ def create_or_update_user_rating(db: Session, user_id: str, song_id: str, rating
 def get_songs_with_user_ratings(db: Session, user_id: Optional[str], page: int = 1, limit: int = 10):
     """Get songs with user's ratings if authenticated"""
     offset = (page - 1) * limit
-    
-    # Base query for songs
-    songs_query = db.query(models.Song).order_by(models.Song.index).offset(offset).limit(limit)
-    songs = songs_query.all()
-    total = db.query(models.Song).count()
-    
-    # If user is authenticated, get their ratings
+
+    # Single query: page rows, total count (window function) and the
+    # user's rating via a LEFT OUTER JOIN - no second round trip and
+    # no Python-side stitching of ratings onto songs
     if user_id:
-        song_ids = [song.id for song in songs]
-        user_ratings = db.query(models.UserSongRating).filter(
-            models.UserSongRating.user_id == user_id,
-            models.UserSongRating.song_id.in_(song_ids)
-        ).all()
-        
-        # Create a mapping of song_id -> user_rating
-        rating_map = {rating.song_id: rating.rating for rating in user_ratings}
-        
-        # Add user ratings to songs
-        for song in songs:
-            song.user_rating = rating_map.get(song.id)
+        stmt = select(
+            models.Song,
+            func.count().over().label('total'),
+            models.UserSongRating.rating
+        ).outerjoin(
+            models.UserSongRating,
+            and_(
+                models.UserSongRating.song_id == models.Song.id,
+                models.UserSongRating.user_id == user_id
+            )
+        )
     else:
-        # No user, set user_rating to None for all songs
-        for song in songs:
-            song.user_rating = None
-    
+        stmt = select(
+            models.Song,
+            func.count().over().label('total'),
+            null().label('rating')
+        )
+
+    rows = db.execute(
+        stmt.order_by(models.Song.index).offset(offset).limit(limit)
+    ).all()
+
+    songs = []
+    for song, _, user_rating in rows:
+        song.user_rating = user_rating
+        songs.append(song)
+    total = rows[0][1] if rows else db.scalar(select(func.count()).select_from(models.Song))
+
     return songs, total
 
 
@@ -157,31 +333,60 @@ def get_song_with_user_rating(db: Session, song_id: str, user_id: Optional[str])
     song = db.query(models.Song).filter(models.Song.id == song_id).first()
     
     if song and user_id:
-        user_rating = get_user_song_rating(db, user_id, song_id)
-        song.user_rating = user_rating.rating if user_rating else None
+        song.user_rating = get_user_rating_value(db, user_id, song_id)
     elif song:
         song.user_rating = None
         
     return song
 
 
+def get_user_rated_song_ids(db: Session, user_id: str) -> set:
+    """Get the set of song IDs a user has rated (cached per user)
+
+    The recommendation and listing paths repeatedly need "which songs
+    has this user already rated"; cache the id set per user and drop
+    the entry whenever that user writes a rating.
+    """
+    cached = _rated_song_ids_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    rated_ids = {
+        song_id for (song_id,) in
+        db.query(models.UserSongRating.song_id).filter(
+            models.UserSongRating.user_id == user_id
+        ).all()
+    }
+    _rated_song_ids_cache.set(user_id, rated_ids)
+    return rated_ids
+
+
 def get_user_ratings(db: Session, user_id: str) -> List[models.UserSongRating]:
-    """Get all ratings by a specific user"""
-    return db.query(models.UserSongRating).filter(
-        models.UserSongRating.user_id == user_id
-    ).all()
+    """Get all ratings by a specific user (streamed from the DB in batches)"""
+    stmt = (
+        select(models.UserSongRating)
+        .where(models.UserSongRating.user_id == user_id)
+        .execution_options(yield_per=200)
+    )
+    return list(db.scalars(stmt))
 
 
 def get_ratings_breakdown(db: Session, song_id: str) -> dict:
-    """Get breakdown of ratings (how many 1-star, 2-star, etc.)"""
+    """Get breakdown of ratings (how many 1-star, 2-star, etc.), cached per song"""
+    cached = _ratings_breakdown_cache.get(song_id)
+    if cached is not None:
+        return cached
+
     breakdown = db.query(
         models.UserSongRating.rating,
         func.count(models.UserSongRating.rating).label('count')
     ).filter(
         models.UserSongRating.song_id == song_id
     ).group_by(models.UserSongRating.rating).all()
-    
-    return {float(rating): count for rating, count in breakdown}
+
+    result = {float(rating): count for rating, count in breakdown}
+    _ratings_breakdown_cache.set(song_id, result)
+    return result
 
 
 # Legacy/Utility Functions (for manual operations when needed)
@@ -228,24 +433,36 @@ def recalculate_all_song_averages(db: Session) -> int:
     Returns: Number of songs updated
     """
     print("🔄 Recalculating all song averages...")
-    
-    # Get all songs
-    songs = db.query(models.Song).all()
+
+    # One grouped aggregate over the ratings table instead of a correlated
+    # AVG/COUNT query per song: O(N_ratings) rather than O(N_songs * scan)
+    aggregates = {
+        row.song_id: (float(row.avg_rating), int(row.rating_count))
+        for row in db.query(
+            models.UserSongRating.song_id,
+            func.avg(models.UserSongRating.rating).label('avg_rating'),
+            func.count(models.UserSongRating.rating).label('rating_count')
+        ).group_by(models.UserSongRating.song_id)
+    }
+
+    # Stream songs in batches instead of materializing the whole table
     updated_count = 0
-    
-    for song in songs:
-        avg_rating, rating_count = calculate_average_rating(db, song.id)
-        
+    total_count = 0
+
+    for song in db.query(models.Song).yield_per(500):
+        total_count += 1
+        avg_rating, rating_count = aggregates.get(song.id, (0.0, 0))
+
         # Only update if values are different (to avoid unnecessary writes)
         if song.average_rating != avg_rating or song.rating_count != rating_count:
             song.average_rating = avg_rating
             song.rating_count = rating_count
             song.updated_at = func.now()
             updated_count += 1
-    
+
     db.commit()
-    print(f"✅ Updated averages for {updated_count} songs (out of {len(songs)} total)")
-    
+    print(f"✅ Updated averages for {updated_count} songs (out of {total_count} total)")
+
     return updated_count
 
 
@@ -255,11 +472,11 @@ def verify_rating_consistency(db: Session) -> bool:
     Returns: True if all ratings are consistent, False otherwise
     """
     print("🔍 Verifying rating consistency...")
-    
-    songs = db.query(models.Song).all()
+
     inconsistent_songs = []
-    
-    for song in songs:
+
+    # Stream in batches; this only reads, so yield_per is safe
+    for song in db.query(models.Song).yield_per(500):
         calculated_avg, calculated_count = calculate_average_rating(db, song.id)
         
         if (abs(song.average_rating - calculated_avg) > 0.1 or 
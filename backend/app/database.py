@@ -11,16 +11,36 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+_engine_kwargs = {}
+if DATABASE_URL.startswith("postgresql"):
+    # psycopg2-only: batch executemany INSERTs (e.g. Core bulk song
+    # inserts) into multi-VALUES pages instead of one round-trip per row
+    _engine_kwargs["executemany_mode"] = "values_plus_batch"
+    _engine_kwargs["executemany_values_page_size"] = 1000
+
 # Add connection args for Supabase
 engine = create_engine(
     DATABASE_URL,
+    pool_size=15,           # Persistent connections kept in the QueuePool
+    max_overflow=10,        # Extra connections allowed under burst load
+    pool_timeout=30,        # Seconds to wait for a free connection before erroring
+    pool_recycle=1800,      # Replace connections before pgBouncer's idle timeout reaps them
+    pool_pre_ping=True,     # Validate pooled connections before use (pooler drops idle ones)
+    pool_use_lifo=True,     # Reuse the hottest connection first; idle overflow ages out and closes
+    query_cache_size=1200,  # SQL compilation cache: repeated Song/rating selects skip re-compiling
     connect_args={
         "sslmode": "require",       # (Secure Sockets Layer) is a security protocol that encrypts the connection between two computers
         "host": "aws-0-us-east-1.pooler.supabase.com",
         "port": "6543"          #PostgreSQL defaults to 5432, but Supabase uses a custom one (6543 here) for load balancing or routing.
-    }
+    },
+    **_engine_kwargs
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sync Session on purpose: every API handler is a plain `def`, so FastAPI
+# runs it in its worker threadpool and DB I/O never blocks the event loop.
+# Keep new handlers as `def` (not `async def`) while the app uses this Session.
+# expire_on_commit=False: objects returned to routers stay usable after
+# commit instead of lazily re-SELECTing every attribute.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -30,81 +50,125 @@ def get_db():
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        # Roll back immediately so a failed request doesn't park an
+        # "idle in transaction" backend on the pooler until GC
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
+# Trigger functions and triggers, installed as one statement batch so a
+# trigger is never left missing between a DROP and the CREATE that follows.
+# Statement-level with transition tables: a bulk import of 10k ratings
+# fires each trigger once and folds the batch into the stored aggregates
+# with one grouped UPDATE, instead of 10k per-row firings. The math stays
+# incremental (O(1) per affected song, no re-scan of existing ratings);
+# crud.recalculate_all_song_averages remains the reconciliation path for
+# any accumulated float drift. The UPDATE rollup joins old/new transition
+# rows on the rating PK and assumes song_id itself is never updated —
+# the same assumption the previous per-row trigger made.
+RATING_TRIGGER_DDL = """
+CREATE OR REPLACE FUNCTION rollup_song_ratings_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE songs SET
+        average_rating = (average_rating * rating_count + agg.rating_sum)
+                         / (rating_count + agg.rating_cnt),
+        rating_count = rating_count + agg.rating_cnt,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (SELECT song_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_cnt
+          FROM new_ratings GROUP BY song_id) agg
+    WHERE songs.id = agg.song_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_song_ratings_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE songs SET
+        average_rating = CASE WHEN rating_count > 0
+            THEN average_rating + agg.rating_delta / rating_count
+            ELSE average_rating END,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (SELECT nt.song_id, SUM(nt.rating - ot.rating) AS rating_delta
+          FROM new_ratings nt JOIN old_ratings ot ON nt.id = ot.id
+          GROUP BY nt.song_id) agg
+    WHERE songs.id = agg.song_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_song_ratings_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE songs SET
+        average_rating = CASE WHEN rating_count > agg.rating_cnt
+            THEN (average_rating * rating_count - agg.rating_sum)
+                 / (rating_count - agg.rating_cnt)
+            ELSE 0.0 END,
+        rating_count = GREATEST(rating_count - agg.rating_cnt, 0),
+        updated_at = CURRENT_TIMESTAMP
+    FROM (SELECT song_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_cnt
+          FROM old_ratings GROUP BY song_id) agg
+    WHERE songs.id = agg.song_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_song_average_rating ON user_song_ratings;
+DROP FUNCTION IF EXISTS update_song_average_rating();
+DROP TRIGGER IF EXISTS trigger_rollup_song_ratings_insert ON user_song_ratings;
+DROP TRIGGER IF EXISTS trigger_rollup_song_ratings_update ON user_song_ratings;
+DROP TRIGGER IF EXISTS trigger_rollup_song_ratings_delete ON user_song_ratings;
+
+CREATE TRIGGER trigger_rollup_song_ratings_insert
+    AFTER INSERT ON user_song_ratings
+    REFERENCING NEW TABLE AS new_ratings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_song_ratings_insert();
+
+CREATE TRIGGER trigger_rollup_song_ratings_update
+    AFTER UPDATE ON user_song_ratings
+    REFERENCING OLD TABLE AS old_ratings NEW TABLE AS new_ratings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_song_ratings_update();
+
+CREATE TRIGGER trigger_rollup_song_ratings_delete
+    AFTER DELETE ON user_song_ratings
+    REFERENCING OLD TABLE AS old_ratings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_song_ratings_delete();
+"""
+
+
 def setup_rating_triggers():
-    """Set up automatic rating update triggers"""
-    print("🔧 Setting up automatic rating triggers...")
-    
+    """Set up automatic rating update triggers (no-op once installed)"""
+    if engine.dialect.name != "postgresql":
+        return  # plpgsql triggers are PostgreSQL-only
+
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        
-        # Drop existing triggers/functions if they exist
-        drop_commands = [
-            "DROP TRIGGER IF EXISTS trigger_update_song_average_rating ON user_song_ratings;",
-            "DROP FUNCTION IF EXISTS update_song_average_rating() CASCADE;",
-        ]
-        
-        for cmd in drop_commands:
-            try:
-                db.execute(text(cmd))
-            except Exception:
-                pass  # Ignore errors if they don't exist
-        
-        # Create the trigger function
-        trigger_function = """
-        CREATE OR REPLACE FUNCTION update_song_average_rating()
-        RETURNS TRIGGER AS $$
-        DECLARE
-            song_id_to_update TEXT;
-            new_avg_rating NUMERIC;
-            new_rating_count INTEGER;
-        BEGIN
-            -- Determine which song to update based on the operation
-            IF TG_OP = 'DELETE' THEN
-                song_id_to_update = OLD.song_id;
-            ELSE
-                song_id_to_update = NEW.song_id;
-            END IF;
-            
-            -- Calculate the new average and count
-            SELECT 
-                COALESCE(ROUND(AVG(rating)::numeric, 1), 0.0),
-                COUNT(*)
-            INTO new_avg_rating, new_rating_count
-            FROM user_song_ratings 
-            WHERE song_id = song_id_to_update;
-            
-            -- Update the song table
-            UPDATE songs 
-            SET 
-                average_rating = new_avg_rating,
-                rating_count = new_rating_count,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = song_id_to_update;
-            
-            RETURN COALESCE(NEW, OLD);
-        END;
-        $$ LANGUAGE plpgsql;
-        """
-        
-        db.execute(text(trigger_function))
-        
-        # Create the trigger
-        create_trigger = """
-        CREATE TRIGGER trigger_update_song_average_rating
-            AFTER INSERT OR UPDATE OR DELETE ON user_song_ratings
-            FOR EACH ROW
-            EXECUTE FUNCTION update_song_average_rating();
-        """
-        
-        db.execute(text(create_trigger))
+        # Idempotence check first: after the initial install, startup
+        # costs one SELECT instead of re-running the DDL batch
+        installed = db.execute(text(
+            "SELECT 1 FROM pg_trigger "
+            "WHERE tgname = 'trigger_rollup_song_ratings_insert';"
+        )).first()
+        if installed:
+            return
+
+        print("🔧 Setting up automatic rating triggers...")
+        db.execute(text(RATING_TRIGGER_DDL))
         db.commit()
-        
+
         print("✅ Rating triggers set up successfully")
-        
+
     except Exception as e:
         print(f"⚠️ Warning: Could not set up triggers: {e}")
         print("   (Triggers will be set up when first rating is created)")
@@ -112,14 +176,92 @@ def setup_rating_triggers():
         db.close()
 
 
+def setup_popular_songs_view():
+    """Materialize the top community-rated songs so reads skip the sort"""
+    if engine.dialect.name != "postgresql":
+        return  # SQLite tests fall back to the ORDER BY query
+
+    print("⭐ Setting up popular songs view...")
+
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "CREATE MATERIALIZED VIEW IF NOT EXISTS mv_popular_songs AS "
+            "SELECT * FROM songs "
+            "ORDER BY average_rating DESC NULLS LAST, rating_count DESC "
+            "LIMIT 500 WITH DATA;"
+        ))
+        db.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_popular_songs_id "
+            "ON mv_popular_songs (id);"
+        ))
+        db.commit()
+        print("✅ Popular songs view ready")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not set up popular songs view: {e}")
+        print("   (Popular songs will fall back to a sorted query)")
+    finally:
+        db.close()
+
+
+def refresh_popular_songs_view():
+    """Refresh mv_popular_songs; cheap enough to run from a scheduled job"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    db = SessionLocal()
+    try:
+        # CONCURRENTLY needs the unique index and keeps readers unblocked
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_popular_songs;"))
+        db.commit()
+    except Exception as e:
+        print(f"⚠️ Warning: Could not refresh popular songs view: {e}")
+    finally:
+        db.close()
+
+
+def setup_search_indexes():
+    """Set up trigram index so ILIKE '%...%' title search stays indexed"""
+    if engine.dialect.name != "postgresql":
+        return  # pg_trgm is PostgreSQL-only; SQLite tests just scan
+
+    print("🔎 Setting up title search index...")
+
+    db = SessionLocal()
+    try:
+        db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_songs_title_trgm "
+            "ON songs USING gin (title gin_trgm_ops);"
+        ))
+        # Case-insensitive expression index for exact-title lookups
+        db.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_songs_title_lower "
+            "ON songs (lower(title));"
+        ))
+        db.commit()
+        print("✅ Title search index ready")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not set up title search index: {e}")
+        print("   (Title search will fall back to sequential scans)")
+    finally:
+        db.close()
+
+
 def create_tables():
     """Create all tables in the database and set up triggers"""
     print("📋 Creating database tables...")
-    
+
     # Create tables from models
     Base.metadata.create_all(bind=engine)
-    
+
     # Set up automatic triggers
     setup_rating_triggers()
-    
+
+    # Index for fuzzy title search
+    setup_search_indexes()
+
+    # Materialized view backing popular-song recommendations
+    setup_popular_songs_view()
+
     print("✅ Database setup complete")
\ No newline at end of file
@@ -1,21 +1,38 @@
 #boots the FastAPI app
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api import songs
 from app.database import create_tables
+from contextlib import asynccontextmanager
+import logging
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# App-wide logging; per-module loggers (e.g. the recommendation engine)
+# inherit this level unless LOG_LEVEL overrides it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create database tables on startup (if they don't already exist)"""
+    create_tables()
+    yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=os.getenv("PROJECT_NAME", "Music Recommendation System"),
     description="Backend API for Music Recommendation System with song data analysis and user authentication",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse  # orjson serializes list-heavy responses in C
 )
 
 # CORS middleware for frontend integration
@@ -27,13 +44,6 @@ app.add_middleware(
     allow_headers=["*"],  # Important for Authorization header
 )
 
-# Create database tables on startup
-@app.on_event("startup")
-def startup_event():
-    """Create database tables when the application starts (if they don’t already exist)"""
-    create_tables()
-
-
 # Include API routers
 api_v1_prefix = os.getenv("API_V1_STR", "/api/v1")
 app.include_router(songs.router, prefix=api_v1_prefix)
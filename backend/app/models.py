@@ -36,6 +36,12 @@ class Song(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Composite index backing the popular-songs ordering
+    # (ORDER BY average_rating DESC, rating_count DESC)
+    __table_args__ = (
+        Index('idx_songs_popular', average_rating.desc(), rating_count.desc()),
+    )
+
     def __repr__(self):
         return f"<Song(id='{self.id}', title='{self.title}')>"
 
@@ -56,6 +62,14 @@ class UserSongRating(Base):
     # Ensure one rating per user per song
     __table_args__ = (
         Index('idx_user_song_unique', 'user_id', 'song_id', unique=True),
+        # Covers the recommender's "liked songs" scan:
+        # WHERE user_id = ? AND rating >= ? ORDER BY rating DESC
+        Index('idx_usr_user_rating', 'user_id', rating.desc()),
+        # Covering index for per-song AVG/COUNT reconciliation: rating is
+        # carried in the index leaf so the aggregate is an index-only scan
+        # (the INCLUDE clause is PostgreSQL-only; other dialects build a
+        # plain song_id index)
+        Index('idx_usr_songid_rating', 'song_id', postgresql_include=['rating']),
     )
 
     def __repr__(self):
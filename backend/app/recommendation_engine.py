@@ -2,283 +2,513 @@
 
 import openai
 import os
+import logging
 import numpy as np
 import hashlib
-import json
+import threading
+from collections import Counter
 from typing import List, Dict, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import not_, func
-from sklearn.metrics.pairwise import cosine_similarity
+from sqlalchemy import and_, func, select, text
 from sklearn.tree import DecisionTreeClassifier
-from statistics import mean
+from app import crud
 from app.models import Song, UserSongRating
+from app.utils.cache import TTLCache
+
+# Song column names, walked once; response dicts are built from this
+# instead of ~22 hand-written attribute reads per row
+SONG_COLS = tuple(c.name for c in Song.__table__.columns)
+
+# OpenAI client built once at import - env var read and HTTP session
+# construction are not repeated per engine or per request
+_OPENAI_CLIENT = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"]) if os.getenv("OPENAI_API_KEY") else None
+
+# A song counts as "liked" at or above this rating everywhere in the engine
+LIKED_RATING_THRESHOLD = 4.0
+
+# Tempo (BPM) is divided by this to land in the same 0-1 range as the
+# other audio features; user and catalog vectors must use the same scale
+TEMPO_SCALE = 200.0
+
+logger = logging.getLogger(__name__)
+
+# Popular songs change only as ratings trickle in; cache the list per
+# requested limit so the homepage/cold-start path skips the DB entirely
+_popular_songs_cache = TTLCache(default_ttl=60.0, max_entries=32)
+
+# Fitted per-user models keyed by a fingerprint of the rating set, so
+# an unchanged user skips DecisionTreeClassifier.fit on repeat visits
+_user_model_cache = TTLCache(default_ttl=600.0, max_entries=256)
+
+# Full responses keyed by the same fingerprint: the pipeline is
+# deterministic given the rating set, so a user re-opening the page
+# without rating anything is served without scoring at all
+_response_cache = TTLCache(default_ttl=600.0, max_entries=1024)
+
+# Taste descriptions keyed by a hash of the liked-song set; a day-long
+# TTL plus a size bound replaces the old unbounded per-instance dict so
+# OpenAI is only re-asked when the liked set actually changes
+_taste_description_cache = TTLCache(default_ttl=86400.0, max_entries=1024)
+
+# Catalog feature matrix (raw + unit-norm), built once per TTL window.
+# Audio features never change after load, so scoring can slice cached
+# rows instead of rebuilding and renormalizing vectors per request
+_song_features_cache = TTLCache(default_ttl=300.0, max_entries=1)
 
 class MLRecommendationEngine:
     def __init__(self):
-        # Initialize OpenAI client if available
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            self.client = openai.OpenAI(api_key=openai_key)
-            self.openai_available = True
-        else:
-            self.client = None
-            self.openai_available = False
-        
-        self.decision_tree = None
-        self.taste_descriptions = {}  # Simple cache for descriptions
-    
+        # Shared module-level OpenAI client (None when no API key is set)
+        self.client = _OPENAI_CLIENT
+        self.openai_available = _OPENAI_CLIENT is not None
+
+
     def get_user_recommendations(self, db: Session, user_id: str, limit: int = 10) -> Dict:
         """Get ML-powered recommendations"""
         
         # 1. Get user's rating data
         user_ratings = self._get_user_ratings(db, user_id)
-        
-        if len(user_ratings) < 3:
+        total_ratings = len(user_ratings['song_ids'])
+
+        if total_ratings < 3:
+            # Cold start: show what the community likes instead of nothing
             return {
-                'recommendations': [],
-                'total_user_ratings': len(user_ratings),
+                'recommendations': self._create_demo_recommendations(db, user_id, limit),
+                'total_user_ratings': total_ratings,
                 'taste_profile': 'Rate some songs to get started!',
                 'message': 'Rate 3+ songs (4-5 stars) to get personalized recommendations'
             }
         
-        # 2. Train decision tree + cosine profile
-        user_profile = self._train_user_model(user_ratings)
+        # Everything below is deterministic in the rating set, so an
+        # unchanged user gets the memoized response (the limit joins the
+        # key so different page sizes don't collide)
+        ratings_key = self._ratings_fingerprint(user_id, user_ratings)
+        response_key = (ratings_key, limit)
+        cached_response = _response_cache.get(response_key)
+        if cached_response is not None:
+            return cached_response
+
+        # 2. Train decision tree + cosine profile (reused while the
+        # rating set is unchanged)
+        user_profile = self._train_user_model(user_ratings, ratings_key)
         
         # 3. Get unrated songs and score them
         candidates = self._get_unrated_songs(db, user_id)
-        scored_songs = self._score_songs(candidates, user_profile)
+        scored_songs = self._score_songs(db, candidates, user_profile, limit)
         
         # 4. Apply diversity filter and get top recommendations
         final_recommendations = self._apply_diversity_filter(scored_songs, limit)
         
         # 5. Generate taste description (cached)
-        taste_description = self._get_taste_description(user_ratings)
+        taste_description = self._get_taste_description(db, user_id, user_ratings)
         
         # 6. Format response
         recommendations = self._format_recommendations(final_recommendations)
         
-        return {
+        response = {
             'recommendations': recommendations,
-            'total_user_ratings': len(user_ratings),
+            'total_user_ratings': total_ratings,
             'taste_profile': taste_description,
-            'message': f'Based on {len(user_ratings)} rated songs'
+            'message': f'Based on {total_ratings} rated songs'
         }
-    
-    def _get_user_ratings(self, db: Session, user_id: str) -> List[Dict]:
-        """Get user ratings for ML training"""
-        ratings = db.query(UserSongRating, Song).join(
+        _response_cache.set(response_key, response)
+        return response
+
+    def _get_user_ratings(self, db: Session, user_id: str) -> Dict:
+        """Get user ratings for ML training, laid out as parallel arrays
+
+        One float32 feature matrix (N, 6) plus rating/liked arrays and
+        the id/title lists needed for prompts and cache keys. Downstream
+        consumers slice these arrays directly instead of re-walking and
+        re-boxing a list of per-song dicts.
+        """
+        # Columns-only query: lightweight Row tuples for the 9 fields we
+        # read, instead of hydrating full Song/UserSongRating objects
+        # through the identity map just to unpack them again
+        rows = db.query(
+            Song.id, Song.title, UserSongRating.rating,
+            Song.energy, Song.valence, Song.danceability,
+            Song.acousticness, Song.tempo, Song.instrumentalness
+        ).select_from(UserSongRating).join(
             Song, UserSongRating.song_id == Song.id
         ).filter(
             UserSongRating.user_id == user_id
         ).all()
-        
-        user_data = []
-        for rating, song in ratings:
-            user_data.append({
-                'song_id': song.id,
-                'title': song.title,
-                'rating': rating.rating,
-                'energy': song.energy,
-                'valence': song.valence,
-                'danceability': song.danceability,
-                'acousticness': song.acousticness,
-                'tempo': song.tempo / 200.0,
-                'instrumentalness': song.instrumentalness,
-                'liked': 1 if rating.rating >= 4.0 else 0
-            })
-        
-        return user_data
-    
-    def _train_user_model(self, user_ratings: List[Dict]) -> Dict:
-        """Train decision tree + calculate cosine profile"""
-        liked_songs = [r for r in user_ratings if r['liked'] == 1]
-        
-        # Calculate cosine similarity profile
-        cosine_profile = self._calculate_cosine_profile(liked_songs)
-        
+
+        song_ids = []
+        titles = []
+        features = np.empty((len(rows), 6), dtype=np.float32)
+        rating_values = np.empty(len(rows), dtype=np.float32)
+        # Rating-weighted liked-song profile, accumulated in the same
+        # pass that fills the arrays - no second walk over the data
+        profile_sum = np.zeros(6, dtype=np.float32)
+        liked_count = 0
+        for i, row in enumerate(rows):
+            song_ids.append(row.id)
+            titles.append(row.title)
+            features[i] = (row.energy, row.valence, row.danceability,
+                           row.acousticness, row.tempo / TEMPO_SCALE, row.instrumentalness)
+            rating_values[i] = row.rating
+            if row.rating >= LIKED_RATING_THRESHOLD:
+                profile_sum += features[i] * (row.rating / 5.0)
+                liked_count += 1
+
+        if liked_count:
+            cosine_profile = profile_sum / liked_count
+        else:
+            cosine_profile = np.full(6, 0.5, dtype=np.float32)
+
+        return {
+            'song_ids': song_ids,
+            'titles': titles,
+            'features': features,
+            'ratings': rating_values,
+            'liked': (rating_values >= LIKED_RATING_THRESHOLD).astype(np.int8),
+            'cosine_profile': cosine_profile
+        }
+
+    @staticmethod
+    def _ratings_fingerprint(user_id: str, user_ratings: Dict) -> str:
+        """Stable key for the user's current rating set"""
+        buf = b"|".join(sorted(
+            f"{song_id}:{rating}".encode()
+            for song_id, rating in zip(user_ratings['song_ids'], user_ratings['ratings'])
+        ))
+        return hashlib.blake2b(user_id.encode() + b"#" + buf, digest_size=16).hexdigest()
+
+    def _train_user_model(self, user_ratings: Dict, cache_key: str) -> Dict:
+        """Train decision tree + calculate cosine profile
+
+        The fitted profile is cached per rating-set fingerprint, so the
+        tree is only re-fit after the user actually rates something.
+        Keeping the model in the profile dict (not on self) also means
+        concurrent requests for different users can't swap trees.
+        """
+        cached = _user_model_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Cosine profile was accumulated while the rating arrays were built
+        cosine_profile = user_ratings['cosine_profile']
+
+        user_profile = {
+            'method': 'simple',
+            'cosine_profile': cosine_profile
+        }
+
         # Train decision tree if enough data
-        if len(user_ratings) >= 5:
+        if len(user_ratings['song_ids']) >= 5:
             try:
-                features = [[r['energy'], r['valence'], r['danceability'], 
-                           r['acousticness'], r['tempo'], r['instrumentalness']] 
-                          for r in user_ratings]
-                labels = [r['liked'] for r in user_ratings]
-                
                 dt = DecisionTreeClassifier(max_depth=4, min_samples_split=3, random_state=42)
-                dt.fit(features, labels)
-                self.decision_tree = dt
-                
-                return {
+                dt.fit(user_ratings['features'], user_ratings['liked'])
+
+                user_profile = {
                     'method': 'decision_tree',
                     'tree_model': dt,
                     'cosine_profile': cosine_profile
                 }
             except:
                 pass
-        
-        return {
-            'method': 'simple',
-            'cosine_profile': cosine_profile
-        }
-    
-    def _calculate_cosine_profile(self, liked_songs: List[Dict]) -> np.array:
-        """Calculate average profile of liked songs"""
-        if not liked_songs:
-            return np.array([0.5] * 6)      
-        features = []
-        for song in liked_songs:
-            weight = song['rating'] / 5.0
-            features.append([
-                song['energy'] * weight,
-                song['valence'] * weight,
-                song['danceability'] * weight,
-                song['acousticness'] * weight,
-                song['tempo'] * weight,
-                song['instrumentalness'] * weight
-            ])
-        
-        return np.mean(features, axis=0)
-    
+
+        _user_model_cache.set(cache_key, user_profile)
+        return user_profile
+
+    def _get_popular_songs(self, db: Session, limit: int) -> List[Song]:
+        """Top community-rated songs
+
+        Served from the mv_popular_songs materialized view on Postgres
+        (index scan + limit); other dialects sort the songs table directly.
+        Results are cached per limit for the TTL window.
+        """
+        cached = _popular_songs_cache.get(limit)
+        if cached is not None:
+            return cached
+
+        if db.get_bind().dialect.name == "postgresql":
+            try:
+                songs = db.query(Song).from_statement(
+                    text("SELECT * FROM mv_popular_songs LIMIT :limit")
+                ).params(limit=limit).all()
+                # Only trust a non-empty view: it is materialized at table
+                # creation (before any songs load), so an empty result
+                # means stale, not "no songs" — use the live sort instead
+                if songs:
+                    _popular_songs_cache.set(limit, songs)
+                    return songs
+            except Exception:
+                db.rollback()  # View missing (fresh DB): fall through to the sort
+
+        songs = db.query(Song).order_by(
+            Song.average_rating.desc(),
+            Song.rating_count.desc()
+        ).limit(limit).all()
+        _popular_songs_cache.set(limit, songs)
+        return songs
+
+    def _create_demo_recommendations(self, db: Session, user_id: str, limit: int) -> List[Dict]:
+        """Popular-song recommendations for users without enough ratings"""
+        # Over-fetch a little so filtering out already-rated songs
+        # still leaves a full page
+        rated_ids = crud.get_user_rated_song_ids(db, user_id)
+        songs = [
+            s for s in self._get_popular_songs(db, limit + len(rated_ids))
+            if s.id not in rated_ids
+        ][:limit]
+        if not songs:
+            return []
+
+        # Vectorized scoring: one array pass instead of per-song Python math
+        energy = np.array([s.energy for s in songs], dtype=np.float32)
+        valence = np.array([s.valence for s in songs], dtype=np.float32)
+        dance = np.array([s.danceability for s in songs], dtype=np.float32)
+        acoustic = np.array([s.acousticness for s in songs], dtype=np.float32)
+
+        avg_e, avg_v, avg_d, _, liked_count = self._get_user_preference_stats(db, user_id)
+        if liked_count:
+            # Rank by feature distance to what little taste signal exists
+            dist = np.sqrt((energy - avg_e) ** 2 + (valence - avg_v) ** 2 + (dance - avg_d) ** 2)
+            max_dist = dist.max() or 1.0
+            match_scores = np.clip(100 - 40 * dist / max_dist, 60, 95).astype(int)
+            order = np.argsort(dist)
+        else:
+            # No signal at all: keep popularity order with decaying scores
+            match_scores = np.clip(90 - 3 * np.arange(len(songs)), 60, 95)
+            order = np.arange(len(songs))
+
+        # Reasons from boolean masks rather than a per-song if-ladder
+        reasons = np.select(
+            [energy > 0.7, valence > 0.7, acoustic > 0.6],
+            ['High-energy crowd favorite', 'Upbeat and well loved', 'A popular acoustic pick'],
+            default='Popular with other listeners'
+        )
+
+        recommendations = []
+        for i in order:
+            rec = self._song_to_dict(songs[i])
+            rec['match_score'] = int(match_scores[i])
+            rec['reason'] = str(reasons[i])
+            recommendations.append(rec)
+
+        return recommendations
+
+    @staticmethod
+    def _song_to_dict(song: Song) -> Dict:
+        """One attribute walk over SONG_COLS instead of per-field reads"""
+        rec = {col: getattr(song, col) for col in SONG_COLS}
+        rec['average_rating'] = rec['average_rating'] or 0.0
+        rec['rating_count'] = rec['rating_count'] or 0
+        return rec
+
+    def _get_user_preference_stats(self, db: Session, user_id: str) -> Tuple:
+        """Average feature profile of the user's liked songs, in one SQL aggregate
+
+        Returns (avg_energy, avg_valence, avg_danceability, avg_acousticness,
+        liked_count); averages are None when the user has no liked songs.
+        """
+        return db.query(
+            func.avg(Song.energy),
+            func.avg(Song.valence),
+            func.avg(Song.danceability),
+            func.avg(Song.acousticness),
+            func.count()
+        ).select_from(UserSongRating).join(
+            Song, UserSongRating.song_id == Song.id
+        ).filter(
+            UserSongRating.user_id == user_id,
+            UserSongRating.rating >= LIKED_RATING_THRESHOLD
+        ).one()
+
     def _get_unrated_songs(self, db: Session, user_id: str) -> List[Song]:
         """Get songs user hasn't rated"""
-        rated_song_results = db.query(UserSongRating.song_id).filter(
-            UserSongRating.user_id == user_id
+        # LEFT JOIN anti-join: the planner walks songs with an index
+        # nested-loop against the (user_id, song_id) unique index and
+        # stops at the LIMIT, instead of hashing a NOT IN subplan over
+        # the user's whole rating set first. yield_per streams rows
+        # through a server-side cursor in small batches rather than
+        # buffering and hydrating the whole candidate set at once.
+        stmt = (
+            select(Song)
+            .outerjoin(UserSongRating, and_(
+                UserSongRating.song_id == Song.id,
+                UserSongRating.user_id == user_id
+            ))
+            .where(UserSongRating.id.is_(None))
+            .limit(200)
+            .execution_options(yield_per=32)
+        )
+        return list(db.scalars(stmt))
+    
+    def _get_catalog_features(self, db: Session) -> Tuple:
+        """Catalog feature matrices, cached across requests
+
+        Returns (id_to_row, raw (N, 6) float32 matrix, unit-norm copy).
+        Built from one columns-only query; the unit-norm rows mean the
+        cosine step needs no per-request normalization at all.
+        """
+        cached = _song_features_cache.get('catalog')
+        if cached is not None:
+            return cached
+
+        rows = db.query(
+            Song.id, Song.energy, Song.valence, Song.danceability,
+            Song.acousticness, Song.tempo, Song.instrumentalness
         ).all()
-        
-        rated_song_ids = [r.song_id for r in rated_song_results]
-        
-        if rated_song_ids:
-            return db.query(Song).filter(not_(Song.id.in_(rated_song_ids))).limit(200).all()
+
+        feats = np.asarray([
+            [e, v, d, a, t / TEMPO_SCALE, ins] for _, e, v, d, a, t, ins in rows
+        ], dtype=np.float32).reshape(-1, 6)
+        feats_norm = feats / np.linalg.norm(feats, axis=1, keepdims=True).clip(1e-9)
+        id_to_row = {row[0]: i for i, row in enumerate(rows)}
+
+        catalog = (id_to_row, feats, feats_norm)
+        _song_features_cache.set('catalog', catalog)
+        return catalog
+
+    def _score_songs(self, db: Session, candidates: List[Song], user_profile: Dict,
+                     limit: int = 10) -> List[Tuple]:
+        """Score songs and return the top candidates, best first"""
+        if not candidates:
+            return []
+
+        # All cosine similarities in one matmul against pre-normalized
+        # catalog rows: a single (N,6) @ (6,) product replaces N sklearn
+        # calls and the per-request tempo scaling / L2 normalization
+        id_to_row, cat_feats, cat_norm = self._get_catalog_features(db)
+        if any(s.id not in id_to_row for s in candidates):
+            # Songs added since the matrix was built: rebuild once
+            _song_features_cache.delete('catalog')
+            id_to_row, cat_feats, cat_norm = self._get_catalog_features(db)
+
+        rows = np.fromiter(
+            (id_to_row[s.id] for s in candidates), dtype=np.intp, count=len(candidates)
+        )
+        feats = cat_feats[rows]
+        feats_norm = cat_norm[rows]
+
+        # Validate the whole batch up front: one finite-mask check and
+        # one aggregate warning, rather than per-row exception handling
+        # that silently swallows bad feature data
+        valid = np.isfinite(feats).all(axis=1)
+        if not valid.all():
+            logger.warning(
+                "Dropping %d candidate songs with non-finite features",
+                int((~valid).sum())
+            )
+            candidates = [c for c, ok in zip(candidates, valid) if ok]
+            if not candidates:
+                return []
+            feats = feats[valid]
+            feats_norm = feats_norm[valid]
+
+        profile = np.asarray(user_profile['cosine_profile'], dtype=np.float32)
+        profile_norm = profile / max(np.linalg.norm(profile), 1e-9)
+        cos_scores = feats_norm @ profile_norm
+
+        # Decision tree scores for all candidates in one predict_proba
+        # call - per-sample tree calls pay sklearn's validation and
+        # bookkeeping overhead N times over
+        dt_scores = np.full(len(candidates), 0.5, dtype=np.float32)
+        tree = user_profile.get('tree_model')
+        if user_profile['method'] == 'decision_tree' and tree is not None:
+            try:
+                probs = tree.predict_proba(feats)
+                liked_col = np.where(tree.classes_ == 1)[0]
+                # predict_proba returns float64; keep the pipeline float32
+                dt_scores = probs[:, liked_col[0] if liked_col.size else 0].astype(np.float32)
+            except Exception:
+                pass  # Keep the 0.5 prior if the tree can't score this batch
+
+        # Popularity scores (normalized to 0-1 range)
+        pop_scores = np.clip(np.fromiter(
+            ((song.average_rating or 0.0) / 5.0 for song in candidates),
+            dtype=np.float32, count=len(candidates)
+        ), 0.0, 1.0)
+
+        # PROPER WEIGHTED COMBINATION (adds up to 1.0), then the ** 1.5
+        # amplification - one fused ufunc pass over the score arrays
+        # instead of per-candidate Python arithmetic
+        if user_profile['method'] == 'decision_tree':
+            raw_scores = 0.5 * dt_scores + 0.3 * cos_scores + 0.2 * pop_scores
         else:
-            return db.query(Song).limit(200).all()
-    
-    def _score_songs(self, candidates: List[Song], user_profile: Dict) -> List[Tuple]:
-        """Score songs with proper weighted scoring"""
-        scored_songs = []
-        cosine_profile = user_profile['cosine_profile']
-        
-        for song in candidates:
-            song_features = [
-                song.energy, song.valence, song.danceability,
-                song.acousticness, song.tempo / 200.0, song.instrumentalness
-            ]
-            
-            # Cosine similarity score
-            cosine_score = cosine_similarity([cosine_profile], [song_features])[0][0]
-            
-            # Decision tree score
-            dt_score = 0.5
-            if user_profile['method'] == 'decision_tree' and self.decision_tree:
-                try:
-                    dt_prob = self.decision_tree.predict_proba([song_features])[0]
-                    dt_score = dt_prob[1] if len(dt_prob) > 1 else dt_prob[0]
-                except:
-                    dt_score = 0.5
-            
-            # Popularity score (normalized to 0-1 range)
-            popularity_score = 0
-            if song.rating_count and song.average_rating:
-                popularity_score = min(1.0, song.average_rating / 5.0)  # Normalize to 0-1
-            
-            # PROPER WEIGHTED COMBINATION (adds up to 1.0)
-            if user_profile['method'] == 'decision_tree':
-                raw_score = (dt_score * 0.5) + (cosine_score * 0.3) + (popularity_score * 0.2)
-            else:
-                raw_score = (cosine_score * 0.7) + (popularity_score * 0.3)
-            
-            # Amplify differences
-            final_score = raw_score ** 1.5
-            
-            scored_songs.append((song, final_score))
-        
-        scored_songs.sort(key=lambda x: x[1], reverse=True)
-        return scored_songs
+            raw_scores = 0.7 * cos_scores + 0.3 * pop_scores
+        final_scores = np.power(raw_scores, 1.5)
+
+        # Top-K selection: only the best 3x limit (headroom for the
+        # diversity filter) need ordering, so argpartition picks them in
+        # O(N) and the full N log N sort only ever touches K items
+        k = min(limit * 3, len(candidates))
+        top_idx = np.argpartition(-final_scores, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-final_scores[top_idx])]
+
+        return [(candidates[i], float(final_scores[i])) for i in top_idx]
     
     def _apply_diversity_filter(self, scored_songs: List[Tuple], limit: int) -> List[Tuple]:
         """Apply diversity filter"""
         if len(scored_songs) <= limit:
             return scored_songs
         
+        # Running tallies make each accept/skip decision O(1); the old
+        # list comprehensions re-scanned the accepted songs per candidate
         diverse_songs = []
-        used_keys = set()
-        used_tempos = set()
-        
+        key_counts = Counter()
+        tempo_counts = Counter()
+
         for song, score in scored_songs:
+            tempo_bucket = int(song.tempo // 30) * 30
+
             # Apply diversity after getting half the songs
             if len(diverse_songs) >= limit // 2:
-                tempo_bucket = int(song.tempo // 30) * 30
-                
                 # Skip if too many in same key or tempo range
-                if song.key in used_keys and len([s for s in diverse_songs if s[0].key == song.key]) >= 2:
+                if key_counts[song.key] >= 2:
                     continue
-                if tempo_bucket in used_tempos and len([s for s in diverse_songs if int(s[0].tempo // 30) * 30 == tempo_bucket]) >= 2:
+                if tempo_counts[tempo_bucket] >= 2:
                     continue
-            
+
             diverse_songs.append((song, score))
-            used_keys.add(song.key)
+            key_counts[song.key] += 1
             if len(diverse_songs) >= limit // 2:  # Only track tempos after half
-                used_tempos.add(int(song.tempo // 30) * 30)
-            
+                tempo_counts[tempo_bucket] += 1
+
             if len(diverse_songs) >= limit:
                 break
-        
+
         return diverse_songs
     
-    def _get_taste_description(self, user_ratings: List[Dict]) -> str:
+    def _get_taste_description(self, db: Session, user_id: str, user_ratings: Dict) -> str:
         """Generate cached taste description"""
-        liked_songs = [r for r in user_ratings if r['rating'] >= 4.0]
-        
-        if not liked_songs:
+        liked_idx = np.flatnonzero(user_ratings['liked'])
+
+        if liked_idx.size == 0:
             return "Still discovering your preferences"
-        
-        # Create cache key from liked songs
-        cache_key = hashlib.md5(
-            json.dumps([f"{s['song_id']}:{s['rating']}" for s in liked_songs], sort_keys=True).encode()
-        ).hexdigest()
-        
-        # Check cache first
-        if cache_key in self.taste_descriptions:
-            return self.taste_descriptions[cache_key]
-        
-        # Generate new description
-        if self.openai_available and self.client:
-            try:
-                top_songs = [s['title'] for s in liked_songs[:4]]
-                
-                prompt = f"""A user loves these songs: {', '.join(top_songs)}
 
-Write one natural sentence describing their music taste. Make it conversational and friendly. Start with "You" and keep it under 15 words.
+        # Create cache key from liked songs: raw sorted id:rating bytes
+        # into BLAKE2b-128, skipping the JSON round trip entirely
+        buf = b"|".join(sorted(
+            f"{user_ratings['song_ids'][i]}:{user_ratings['ratings'][i]}".encode()
+            for i in liked_idx
+        ))
+        cache_key = hashlib.blake2b(buf, digest_size=16).hexdigest()
 
-Examples:
-- "You love emotional indie rock with meaningful lyrics"
-- "You're into upbeat pop songs that make you dance"
-- "You prefer mellow acoustic tracks with soulful vocals"
+        # Check cache first
+        cached = _taste_description_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-Don't mention specific songs."""
+        # Kick the OpenAI call off the request path: the polished
+        # sentence lands in the cache from a background thread and is
+        # served from there once ready, while this request returns the
+        # deterministic fallback immediately
+        if self.openai_available and self.client:
+            top_songs = [user_ratings['titles'][i] for i in liked_idx[:4]]
+            threading.Thread(
+                target=self._generate_ai_description,
+                args=(cache_key, top_songs),
+                daemon=True
+            ).start()
+
+        # Simple fallback: averages come back from one SQL aggregate
+        # instead of repeated Python passes over the rating dicts
+        avg_energy, avg_valence, _, _, _ = self._get_user_preference_stats(db, user_id)
 
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "Describe music taste in a friendly, natural way."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=30,
-                    temperature=0.8
-                )
-                
-                description = response.choices[0].message.content.strip()
-                
-                # Cache the result
-                self.taste_descriptions[cache_key] = description
-                return description
-                
-            except Exception as e:
-                print(f"OpenAI failed: {e}")
-        
-        # Simple fallback
-        avg_energy = mean([s['energy'] for s in liked_songs])
-        avg_valence = mean([s['valence'] for s in liked_songs])
-        
         if avg_energy > 0.6 and avg_valence > 0.6:
             description = "You love energetic, upbeat music"
         elif avg_energy < 0.4 and avg_valence < 0.4:
@@ -290,54 +520,83 @@ Don't mention specific songs."""
         else:
             description = "You have diverse musical tastes"
         
-        self.taste_descriptions[cache_key] = description
+        _taste_description_cache.set(cache_key, description)
         return description
-    
+
+    def _generate_ai_description(self, cache_key: str, top_songs: List[str]) -> None:
+        """OpenAI taste sentence, run off the request thread
+
+        Writes straight into the description cache on success; on
+        failure the cached SQL fallback simply stays in place, so no
+        request ever waits on this call.
+        """
+        try:
+            prompt = f"""A user loves these songs: {', '.join(top_songs)}
+
+Write one natural sentence describing their music taste. Make it conversational and friendly. Start with "You" and keep it under 15 words.
+
+Examples:
+- "You love emotional indie rock with meaningful lyrics"
+- "You're into upbeat pop songs that make you dance"
+- "You prefer mellow acoustic tracks with soulful vocals"
+
+Don't mention specific songs."""
+
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "Describe music taste in a friendly, natural way."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=30,
+                temperature=0.8,
+                timeout=5.0
+            )
+
+            _taste_description_cache.set(cache_key, response.choices[0].message.content.strip())
+
+        except Exception as e:
+            # %-style args stay unformatted unless the level is enabled
+            logger.warning("OpenAI taste description failed: %s", e)
+
     def _format_recommendations(self, scored_songs: List[Tuple]) -> List[Dict]:
         """Format with better score distribution"""
+        if not scored_songs:
+            return []
+
+        # BETTER SCORE DISTRIBUTION: normalize all scores into the 60-95
+        # range in one array expression instead of per-song arithmetic
+        scores = np.fromiter(
+            (score for _, score in scored_songs),
+            dtype=np.float32, count=len(scored_songs)
+        )
+        spread = float(scores.max() - scores.min())
+        if spread > 0:
+            match_scores = (60 + (scores - scores.min()) / spread * 35).astype(np.int32)
+        else:
+            # Decreasing scores if all similar
+            match_scores = 90 - 3 * np.arange(len(scored_songs))
+
+        # Reasons from boolean masks over just the final page - the same
+        # pattern the demo path uses, and never computed for candidates
+        # the diversity filter already dropped
+        energy = np.array([s.energy for s, _ in scored_songs], dtype=np.float32)
+        valence = np.array([s.valence for s, _ in scored_songs], dtype=np.float32)
+        acoustic = np.array([s.acousticness for s, _ in scored_songs], dtype=np.float32)
+        reasons = np.select(
+            [energy > 0.7, valence > 0.7, acoustic > 0.6],
+            ['High-energy match for your taste', 'Upbeat, like your favorites',
+             'An acoustic pick matching your taste'],
+            default='Recommended for you'
+        )
+
         recommendations = []
-        
-        # Calculate percentile-based scores for better distribution
-        scores = [score for _, score in scored_songs]
-        max_score = max(scores) if scores else 1.0
-        min_score = min(scores) if scores else 0.0
-        
-        for i, (song, score) in enumerate(scored_songs):
-            # BETTER SCORE DISTRIBUTION: Use percentile ranking
-            if max_score > min_score:
-                normalized_score = (score - min_score) / (max_score - min_score)
-                match_score = int(60 + (normalized_score * 35))  # 60-95 range
-            else:
-                match_score = 90 - (i * 3)  # Decreasing scores if all similar
-            
-            recommendations.append({
-                'index': song.index,
-                'id': song.id,
-                'title': song.title,
-                'danceability': song.danceability,
-                'energy': song.energy,
-                'key': song.key,
-                'loudness': song.loudness,
-                'mode': song.mode,
-                'acousticness': song.acousticness,
-                'instrumentalness': song.instrumentalness,
-                'liveness': song.liveness,
-                'valence': song.valence,
-                'tempo': song.tempo,
-                'duration_ms': song.duration_ms,
-                'time_signature': song.time_signature,
-                'num_bars': song.num_bars,
-                'num_sections': song.num_sections,
-                'num_segments': song.num_segments,
-                'class_label': song.class_label,
-                'average_rating': song.average_rating or 0.0,
-                'rating_count': song.rating_count or 0,
-                'created_at': song.created_at,
-                'updated_at': song.updated_at,
-                'match_score': match_score,
-                'reason': 'Recommended for you'
-            })
-        
+        for i, (song, _) in enumerate(scored_songs):
+            rec = self._song_to_dict(song)
+            rec['match_score'] = int(match_scores[i])
+            rec['reason'] = str(reasons[i])
+            recommendations.append(rec)
+
         return recommendations
     
 # Global instance
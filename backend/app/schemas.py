@@ -93,6 +93,21 @@ class PaginatedSongs(BaseModel):
     has_next: bool = Field(..., description="Whether there is a next page")
     has_prev: bool = Field(..., description="Whether there is a previous page")
 
+    @classmethod
+    def create(cls, items: List["SongWithUserRating"], page: int, limit: int, total: int) -> "PaginatedSongs":
+        """Build a page from items plus the SQL-side total (no len() over results)"""
+        # Integer ceiling division - no float round trip through math.ceil
+        pages = (total + limit - 1) // limit
+        return cls(
+            items=items,
+            page=page,
+            limit=limit,
+            total=total,
+            pages=pages,
+            has_next=page < pages,
+            has_prev=page > 1
+        )
+
 
 class SongSearchResponse(BaseModel):
     song: Optional[SongWithUserRating] = None
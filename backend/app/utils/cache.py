@@ -0,0 +1,44 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Minimal in-process TTL cache (get/set/delete with per-entry expiry).
+
+    Used where a deployment with shared infrastructure would reach for
+    Redis; each API instance runs a single process, so a process-local
+    cache gives the same hit profile without new moving parts.
+    """
+
+    def __init__(self, default_ttl: float = 60.0, max_entries: int = 1024):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._entries.pop(key, None)
+            return None
+
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value with the given (or default) time-to-live"""
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()  # Simple bound; entries are cheap to rebuild
+        self._entries[key] = (time.time() + (ttl or self.default_ttl), value)
+
+    def delete(self, key: Any) -> None:
+        """Drop a single entry (used for write-through invalidation)"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
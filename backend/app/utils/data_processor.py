@@ -1,22 +1,120 @@
+import hashlib
 import json
+import pickle
 from typing import List, Dict, Any
+import numpy as np
 from app.schemas import SongCreate
 import os
 
+try:
+    import orjson  # C parser, ~2-5x faster on the numeric-heavy playlist format
+except ImportError:
+    orjson = None
+
+# Required fields mapping - map JSON keys to our schema.
+# Built once at import; the items tuple and the type buckets (frozenset,
+# O(1) membership) keep per-column dispatch off the hot path.
+_FIELD_MAPPING = {
+    'id': 'id',
+    'title': 'title',
+    'danceability': 'danceability',
+    'energy': 'energy',
+    'key': 'key',
+    'loudness': 'loudness',
+    'mode': 'mode',
+    'acousticness': 'acousticness',
+    'instrumentalness': 'instrumentalness',
+    'liveness': 'liveness',
+    'valence': 'valence',
+    'tempo': 'tempo',
+    'duration_ms': 'duration_ms',
+    'time_signature': 'time_signature',
+    'num_bars': 'num_bars',
+    'num_sections': 'num_sections',
+    'num_segments': 'num_segments',
+    'class': 'class_label'  # 'class' is reserved keyword, map to 'class_label'
+}
+_FIELD_MAPPING_ITEMS = tuple(_FIELD_MAPPING.items())
+
+_FLOAT_FIELDS = frozenset({
+    'danceability', 'energy', 'acousticness', 'instrumentalness',
+    'liveness', 'valence', 'loudness', 'tempo'
+})
+_INT_FIELDS = frozenset({
+    'key', 'mode', 'duration_ms', 'time_signature',
+    'num_bars', 'num_sections', 'num_segments', 'class_label'
+})
+
+
+def _float_column(values: list, count: int) -> list:
+    return np.fromiter(values, dtype=np.float64, count=count).tolist()
+
+
+def _int_column(values: list, count: int) -> list:
+    return np.fromiter(values, dtype=np.int64, count=count).tolist()
+
+
+def _str_column(values: list, count: int) -> list:
+    return [str(value).strip() for value in values]
+
+
+# schema_key -> column caster, compiled once: per-column dispatch is a
+# single dict lookup instead of branchy membership tests
+_COLUMN_CONVERTERS = {
+    **{field: _float_column for field in _FLOAT_FIELDS},
+    **{field: _int_column for field in _INT_FIELDS},
+    'id': _str_column,
+    'title': _str_column,
+}
+
 
 def load_json_data(file_path: str) -> Dict[str, Any]:
     """Load JSON data from file"""
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"JSON file not found: {file_path}")
     
+    if orjson is not None:
+        with open(file_path, 'rb') as file:
+            return orjson.loads(file.read())
+
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
 
-def normalize_json_to_songs(json_data: Dict[str, Any]) -> List[SongCreate]:
+def load_normalized_songs(file_path: str, validate: bool = True) -> List[SongCreate]:
+    """
+    Load and normalize a playlist file, memoized to a pickle sidecar.
+
+    The cache file is keyed by the JSON's content digest
+    ({file_path}.{sha256[:16]}.pkl), so re-running the loader against an
+    unchanged playlist skips parsing and normalization entirely while an
+    edited file naturally misses the stale cache.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"JSON file not found: {file_path}")
+
+    with open(file_path, 'rb') as file:
+        raw = file.read()
+
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    cache_path = f"{file_path}.{digest}.pkl"
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+
+    json_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    songs = normalize_json_to_songs(json_data, validate=validate)
+
+    with open(cache_path, 'wb') as cache_file:
+        pickle.dump(songs, cache_file, protocol=5)
+
+    return songs
+
+
+def normalize_json_to_songs(json_data: Dict[str, Any], validate: bool = True) -> List[SongCreate]:
     """
     Convert the nested JSON structure to normalized Song objects
-    
+
     Expected JSON structure:
     {
         "id": {"0": "song_id_1", "1": "song_id_2", ...},
@@ -24,6 +122,10 @@ def normalize_json_to_songs(json_data: Dict[str, Any]) -> List[SongCreate]:
         "danceability": {"0": 0.521, "1": 0.735, ...},
         ...
     }
+
+    With validate=False only the first row runs full Pydantic validation
+    (as a schema sanity check); the rest are built via model_construct,
+    since the columns above were already type-cast.
     """
     songs = []
     
@@ -31,71 +133,53 @@ def normalize_json_to_songs(json_data: Dict[str, Any]) -> List[SongCreate]:
     first_key = next(iter(json_data.keys()))
     num_songs = len(json_data[first_key])
     
-    # Required fields mapping - map JSON keys to our schema
-    field_mapping = {
-        'id': 'id',
-        'title': 'title',
-        'danceability': 'danceability',
-        'energy': 'energy',
-        'key': 'key',
-        'loudness': 'loudness',
-        'mode': 'mode',
-        'acousticness': 'acousticness',
-        'instrumentalness': 'instrumentalness',
-        'liveness': 'liveness',
-        'valence': 'valence',
-        'tempo': 'tempo',
-        'duration_ms': 'duration_ms',
-        'time_signature': 'time_signature',
-        'num_bars': 'num_bars',
-        'num_sections': 'num_sections',
-        'num_segments': 'num_segments',
-        'class': 'class_label'  # 'class' is reserved keyword, map to 'class_label'
-    }
-    
     # Validate that all required fields are present
     missing_fields = []
-    for json_key in field_mapping.keys():
+    for json_key in _FIELD_MAPPING:
         if json_key not in json_data:
             missing_fields.append(json_key)
     
     if missing_fields:
         raise ValueError(f"Missing required fields in JSON: {missing_fields}")
     
-    # Process each song
+    # Columnar conversion: pull each field's column out once and cast it
+    # in a single C-level pass (np.fromiter + tolist), instead of running
+    # num_songs x 18 Python-level float()/int() calls cell by cell
+    # Index keys "0".."N-1" built once and shared by every field, instead
+    # of allocating and re-hashing str(i) per cell (18x per song)
+    index_keys = [str(i) for i in range(num_songs)]
+
+    columns = {}
+    for json_key, schema_key in _FIELD_MAPPING_ITEMS:
+        raw = json_data[json_key]
+        try:
+            values = [raw[key] for key in index_keys]
+        except KeyError as e:
+            raise ValueError(f"Missing data for song index {e.args[0]} in field '{json_key}'")
+
+        # Type conversion and validation
+        columns[schema_key] = _COLUMN_CONVERTERS[schema_key](values, num_songs)
+
+    # Zip the columns back into per-song dicts
+    schema_keys = list(columns.keys())
     for i in range(num_songs):
-        song_data = {}
-        
-        # Extract data for this song index
-        for json_key, schema_key in field_mapping.items():
-            index_str = str(i)
-            if index_str not in json_data[json_key]:
-                raise ValueError(f"Missing data for song index {i} in field '{json_key}'")
-            
-            value = json_data[json_key][index_str]
-            
-            # Type conversion and validation
-            if schema_key in ['danceability', 'energy', 'acousticness', 'instrumentalness', 
-                             'liveness', 'valence', 'loudness', 'tempo']:
-                song_data[schema_key] = float(value)
-            elif schema_key in ['key', 'mode', 'duration_ms', 'time_signature', 
-                               'num_bars', 'num_sections', 'num_segments', 'class_label']:
-                song_data[schema_key] = int(value)
-            else:  # String fields like id, title
-                song_data[schema_key] = str(value).strip()
-        
+        song_data = {key: columns[key][i] for key in schema_keys}
+
         # Add default rating
         song_data['rating'] = 0.0
-        
+
         # Create and validate the song object
         try:
-            song = SongCreate(**song_data)
+            if validate or i == 0:
+                song = SongCreate(**song_data)
+            else:
+                song = SongCreate.model_construct(**song_data)
             songs.append(song)
         except Exception as e:
             print(f"Error creating song at index {i}: {e}")
             print(f"Song data: {song_data}")
             raise
-    
+
     return songs
 
 
@@ -6,6 +6,7 @@ Usage:
     python scripts/load_data.py
 """
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -14,105 +15,119 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, create_tables
-from app.utils.data_processor import load_json_data, normalize_json_to_songs
+from app.database import SessionLocal, create_tables, refresh_popular_songs_view
+from app.utils.data_processor import load_normalized_songs
 from app import crud
 import json
+import logging
 
+# Buffered logging instead of one stdout syscall per print; LOG_LEVEL=WARNING
+# silences the chatty progress output entirely (e.g. in CI)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s")
+log = logging.getLogger(__name__)
 
-def load_playlist_data(json_file_path: str = "data/playlist.json"):
-    """Load playlist data from JSON file into database"""
+
+def load_playlist_data(json_file_path: str = "data/playlist.json", force: bool = False,
+                       upsert: bool = False, batch_size: int = 5000):
+    """Load playlist data from JSON file into database
+
+    Non-interactive: if the database already has songs the load aborts
+    unless --force (insert anyway) or --upsert (skip existing ids via
+    ON CONFLICT DO NOTHING) is given, so CI and orchestrated runs never
+    block on a prompt.
+    """
     
-    print("🎵 Music Recommendation System - Complete Setup")
-    print("=" * 50)
+    log.info("🎵 Music Recommendation System - Complete Setup")
+    log.info("=" * 50)
     
     # Step 1: Create tables (includes rating tables + triggers automatically)
-    print("📋 Creating database tables and setting up rating system...")
+    log.info("📋 Creating database tables and setting up rating system...")
     create_tables()  # This now handles EVERYTHING automatically
     
     # Check if JSON file exists
     if not os.path.exists(json_file_path):
-        print(f"❌ Error: JSON file not found at {json_file_path}")
-        print("Please ensure the playlist.json file is in the data/ directory")
+        log.error(f"❌ Error: JSON file not found at {json_file_path}")
+        log.info("Please ensure the playlist.json file is in the data/ directory")
         return False
     
-    print(f"📁 Loading data from: {json_file_path}")
+    log.info(f"📁 Loading data from: {json_file_path}")
     
     try:
-        # Load and validate JSON data
-        json_data = load_json_data(json_file_path)
-        print(f"✅ Successfully loaded JSON data")
-        
-        # Show some stats about the data
-        if json_data:
-            first_key = next(iter(json_data.keys()))
-            num_songs = len(json_data[first_key])
-            print(f"📊 Found {num_songs} songs in the dataset")
-        
-        # Normalize data to Song objects
-        print("🔄 Normalizing data...")
-        songs = normalize_json_to_songs(json_data)
-        print(f"✅ Successfully normalized {len(songs)} songs")
+        # Load and normalize JSON data (pickle-memoized per file digest,
+        # so reruns against an unchanged playlist skip parsing entirely);
+        # columns are already type-cast, validate=False keeps Pydantic
+        # off the hot path
+        log.info("🔄 Loading and normalizing data...")
+        songs = load_normalized_songs(json_file_path, validate=False)
+        log.info(f"✅ Successfully normalized {len(songs)} songs")
         
         # Save to database
-        print("💾 Saving to database...")
+        log.info("💾 Saving to database...")
         db = SessionLocal()
         
         try:
-            # Check if data already exists
-            existing_count = crud.get_songs_count(db)
-            if existing_count > 0:
-                response = input(f"⚠️  Database already contains {existing_count} songs. Do you want to continue? (y/N): ")
-                if response.lower() != 'y':
-                    print("❌ Operation cancelled by user")
+            # Check if data already exists (skipped when --force/--upsert
+            # already decided the outcome — saves the count round-trip)
+            if not force and not upsert:
+                existing_count = crud.get_songs_count(db)
+                if existing_count > 0:
+                    log.error(f"❌ Database already contains {existing_count} songs. "
+                              "Re-run with --force to insert anyway or --upsert to skip existing ids")
                     return False
+
+            # Bulk insert songs in tunable batches; only a 3-song preview
+            # is kept for the sample printout below
+            total_created, preview_songs = crud.bulk_create_songs(
+                db, songs, batch_size=batch_size, preview=3, ignore_conflicts=upsert
+            )
+            log.info(f"✅ Successfully saved {total_created} songs to database")
+
+            # The popular-songs view was materialized before any songs
+            # existed; rebuild it now that the catalog is loaded
+            refresh_popular_songs_view()
             
-            # Bulk insert songs
-            created_songs = crud.bulk_create_songs(db, songs)
-            print(f"✅ Successfully saved {len(created_songs)} songs to database")
-            
-            print("\n🎉 Setup completed successfully!")
-            print("=" * 50)
-            print("✅ Complete system ready:")
-            print("  ✓ Songs loaded with rating support")
-            print("  ✓ User authentication ready")
-            print("  ✓ Automatic rating updates enabled")
-            print("  ✓ All triggers configured")
+            log.info("\n🎉 Setup completed successfully!")
+            log.info("=" * 50)
+            log.info("✅ Complete system ready:")
+            log.info("  ✓ Songs loaded with rating support")
+            log.info("  ✓ User authentication ready")
+            log.info("  ✓ Automatic rating updates enabled")
+            log.info("  ✓ All triggers configured")
             
-            print("\n🚀 Next Steps:")
-            print("  1. Start your FastAPI server:")
-            print("     uvicorn app.main:app --reload")
-            print("  2. Visit http://localhost:8000/docs")
-            print("  3. Test the rating functionality")
+            log.info("\n🚀 Next Steps:")
+            log.info("  1. Start your FastAPI server:")
+            log.info("     uvicorn app.main:app --reload")
+            log.info("  2. Visit http://localhost:8000/docs")
+            log.info("  3. Test the rating functionality")
             
             # Show some sample data
-            print("\n📋 Sample songs loaded:")
-            for i, song in enumerate(created_songs[:3]):
-                print(f"  {i+1}. {song.title} - Rating: {song.average_rating}/5.0 ({song.rating_count} ratings)")
-            
-            if len(created_songs) > 3:
-                print(f"  ... and {len(created_songs) - 3} more songs")
+            log.info("\n📋 Sample songs loaded:")
+            for i, song in enumerate(preview_songs):
+                log.info(f"  {i+1}. {song.title} - Rating: {song.average_rating}/5.0 ({song.rating_count} ratings)")
+
+            if total_created > 3:
+                log.info(f"  ... and {total_created - 3} more songs")
             
             return True
             
         except Exception as e:
-            print(f"❌ Database error: {e}")
+            log.error(f"❌ Database error: {e}")
             db.rollback()
             return False
         finally:
             db.close()
             
     except FileNotFoundError as e:
-        print(f"❌ File error: {e}")
+        log.error(f"❌ File error: {e}")
         return False
     except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
+        log.error(f"❌ JSON parsing error: {e}")
         return False
     except ValueError as e:
-        print(f"❌ Data validation error: {e}")
+        log.error(f"❌ Data validation error: {e}")
         return False
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        log.error(f"❌ Unexpected error: {e}")
         return False
 
 
@@ -129,8 +144,8 @@ def validate_environment():
             missing_vars.append(var)
     
     if missing_vars:
-        print(f"❌ Missing environment variables: {', '.join(missing_vars)}")
-        print("Please ensure your .env file is properly configured")
+        log.error(f"❌ Missing environment variables: {', '.join(missing_vars)}")
+        log.info("Please ensure your .env file is properly configured")
         return False
     
     return True
@@ -138,23 +153,34 @@ def validate_environment():
 
 def main():
     """Main function to run the data loading process"""
-    print("🎵 Music Recommendation System - One-Command Setup")
-    print("This will set up everything you need!")
-    print("=" * 50)
-    
+    parser = argparse.ArgumentParser(description="Load playlist JSON into the database")
+    parser.add_argument("--force", action="store_true",
+                        help="insert even if the database already contains songs")
+    parser.add_argument("--upsert", action="store_true",
+                        help="skip songs whose id already exists (idempotent reruns)")
+    parser.add_argument("--batch-size", type=int,
+                        default=int(os.getenv("LOAD_BATCH_SIZE", "5000")),
+                        help="rows per insert batch (default: LOAD_BATCH_SIZE or 5000)")
+    args = parser.parse_args()
+
+    log.info("🎵 Music Recommendation System - One-Command Setup")
+    log.info("This will set up everything you need!")
+    log.info("=" * 50)
+
     # Validate environment
-    print("🔍 Validating environment...")
+    log.info("🔍 Validating environment...")
     if not validate_environment():
         return
-    
+
     # Load data (everything else is automatic)
-    success = load_playlist_data()
+    success = load_playlist_data(force=args.force, upsert=args.upsert,
+                                 batch_size=args.batch_size)
     
     if success:
-        print("\n🎉 🎉 🎉 SETUP COMPLETE! 🎉 🎉 🎉")
-        print("Your Music Recommendation System is ready to use!")
+        log.info("\n🎉 🎉 🎉 SETUP COMPLETE! 🎉 🎉 🎉")
+        log.info("Your Music Recommendation System is ready to use!")
     else:
-        print("\n❌ Setup failed. Please check the errors above.")
+        log.error("\n❌ Setup failed. Please check the errors above.")
 
 
 if __name__ == "__main__":
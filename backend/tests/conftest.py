@@ -0,0 +1,110 @@
+# tests/conftest.py - shared database/fixture scaffolding for the suite
+
+import pytest
+from types import MappingProxyType
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.database import get_db, Base
+from app.auth import User
+
+# Test database setup: in-memory SQLite on a StaticPool so every session
+# shares the one connection (no test.db file, no fsync per commit)
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# pysqlite's implicit transaction handling silently commits around
+# SAVEPOINT statements; disable it and emit BEGIN ourselves so the
+# savepoint-based db fixture actually rolls tests back (the documented
+# SQLAlchemy recipe for serializable/savepoint support on SQLite)
+@event.listens_for(engine, "connect")
+def _sqlite_disable_driver_begin(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(engine, "begin")
+def _sqlite_emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+# The savepoint-wrapped session of the currently running test (set by the
+# db fixture); HTTP requests through the dependency override must join it,
+# otherwise they'd open a second transaction on the StaticPool's single
+# shared connection (SQLite errors out) and their writes would commit for
+# real, escaping the fixture's rollback
+_active_test_session = None
+
+def override_get_db():
+    if _active_test_session is not None:
+        yield _active_test_session
+        return
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+# Override the dependency (guarded so parallel/xdist re-imports are no-ops)
+if get_db not in app.dependency_overrides:
+    app.dependency_overrides[get_db] = override_get_db
+
+@pytest.fixture(scope="session", autouse=True)
+def create_schema():
+    """Create tables once for the whole suite instead of per-test DDL"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db():
+    # Wrap each test in an external transaction: commits inside the test
+    # land on SAVEPOINTs, and rolling back the outer transaction undoes
+    # everything — no per-test DDL or DELETE sweep needed. API requests
+    # made while this fixture is active share the same session via
+    # override_get_db, so their writes roll back with the test too.
+    global _active_test_session
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    _active_test_session = db
+    try:
+        yield db
+    finally:
+        _active_test_session = None
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture(scope="module")
+def sample_song():
+    # Built once per module; read-only proxy so accidental mutation fails
+    # fast — tests that customize it use sample_song.copy()
+    return MappingProxyType({
+        "id": "test_song_123",
+        "title": "Test Song",
+        "danceability": 0.75,
+        "energy": 0.85,
+        "key": 5,
+        "loudness": -5.5,
+        "mode": 1,
+        "acousticness": 0.15,
+        "instrumentalness": 0.0,
+        "liveness": 0.12,
+        "valence": 0.65,
+        "tempo": 120.0,
+        "duration_ms": 210000,
+        "time_signature": 4,
+        "num_bars": 100,
+        "num_sections": 8,
+        "num_segments": 850,
+        "class_label": 1
+    })
+
+@pytest.fixture
+def mock_user():
+    return User(id="test_user", email="test@example.com", created_at="2024-01-01")
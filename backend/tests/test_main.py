@@ -1,85 +1,63 @@
 # tests/test_main.py - Working around TestClient compatibility issue
+# (engine, db/sample_song fixtures etc. live in conftest.py)
 
 import pytest
-import os
-import asyncio
-from unittest.mock import patch
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from dataclasses import dataclass
 
 # Import httpx directly for custom client
 import httpx
 
 # Import FastAPI app components
 from app.main import app
-from app.database import get_db, Base
 from app import crud, schemas
-from app.auth import User
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Canned fallback payloads, built once instead of per simulated request
+_WELCOME_PAYLOAD = {"message": "Welcome to Music Recommendation System API", "version": "2.0.0"}
+_HEALTH_PAYLOAD = {"status": "healthy", "service": "music-recommendation-api"}
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
 
-# Override the dependency
-app.dependency_overrides[get_db] = override_get_db
+@dataclass(slots=True)
+class _MockResponse:
+    """Stand-in response for the no-TestClient fallback path"""
+    status_code: int
+    _payload: dict
+
+    def json(self):
+        return self._payload
+
 
 # Custom test client that works with newer httpx versions
 class CustomTestClient:
     def __init__(self, app):
         self.app = app
         self.base_url = "http://testserver"
-    
-    def _make_request(self, method, url, **kwargs):
-        """Make request using httpx directly"""
-        from starlette.applications import Starlette
-        from starlette.testclient import TestClient as StarletteTestClient
-        
-        # Try using the old TestClient first, if it fails, use httpx directly
+        # Detect TestClient compatibility once and keep a single entered
+        # client (one lifespan startup) instead of building a fresh one
+        # with a full startup/shutdown cycle per request
         try:
-            with StarletteTestClient(self.app) as client:
-                return getattr(client, method.lower())(url, **kwargs)
+            from starlette.testclient import TestClient as StarletteTestClient
+            self._inner = StarletteTestClient(self.app).__enter__()
         except TypeError:
-            # If TestClient fails, we'll simulate the request
-            # This is a simplified version - for a full implementation you'd need ASGI handling
-            import json
-            from starlette.responses import JSONResponse
-            
-            # This is a basic simulation - in reality you'd need full ASGI request handling
-            # For now, let's just test basic functionality
-            if method.upper() == "GET" and url == "/":
-                return type('Response', (), {
-                    'status_code': 200,
-                    'json': lambda: {"message": "Welcome to Music Recommendation System API", "version": "2.0.0"}
-                })()
-            elif method.upper() == "GET" and url == "/health":
-                return type('Response', (), {
-                    'status_code': 200,
-                    'json': lambda: {"status": "healthy", "service": "music-recommendation-api"}
-                })()
-            else:
-                # For complex cases, we'll need actual ASGI handling
-                # Let's try a different approach
-                return self._asgi_request(method, url, **kwargs)
-    
-    def _asgi_request(self, method, url, **kwargs):
-        """Handle ASGI request manually"""
-        import json
-        from starlette.requests import Request
-        from starlette.responses import Response
-        
-        # Create a mock response for testing
-        return type('Response', (), {
-            'status_code': 200,
-            'json': lambda: {"test": "response"}
-        })()
+            self._inner = None
+
+    def __del__(self):
+        if getattr(self, '_inner', None) is not None:
+            self._inner.__exit__(None, None, None)
+
+    def _make_request(self, method, url, **kwargs):
+        """Make request using the shared inner client"""
+        if self._inner is not None:
+            return getattr(self._inner, method.lower())(url, **kwargs)
+
+        # If TestClient is incompatible, simulate the request
+        # This is a basic simulation - in reality you'd need full ASGI request handling
+        # For now, let's just test basic functionality
+        if method.upper() == "GET" and url == "/":
+            return _MockResponse(200, _WELCOME_PAYLOAD)
+        elif method.upper() == "GET" and url == "/health":
+            return _MockResponse(200, _HEALTH_PAYLOAD)
+        else:
+            return _MockResponse(200, {"test": "response"})
     
     def get(self, url, **kwargs):
         return self._make_request("GET", url, **kwargs)
@@ -101,50 +79,11 @@ except (TypeError, AttributeError) as e:
     print(f"Using custom test client due to: {e}")
     test_client = CustomTestClient(app)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
-    """Provide test client"""
+    """Provide the shared test client (one instance for the whole suite)"""
     return test_client
 
-@pytest.fixture
-def db():
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        # Clean up tables after each test
-        Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture
-def sample_song():
-    return {
-        "id": "test_song_123",
-        "title": "Test Song",
-        "danceability": 0.75,
-        "energy": 0.85,
-        "key": 5,
-        "loudness": -5.5,
-        "mode": 1,
-        "acousticness": 0.15,
-        "instrumentalness": 0.0,
-        "liveness": 0.12,
-        "valence": 0.65,
-        "tempo": 120.0,
-        "duration_ms": 210000,
-        "time_signature": 4,
-        "num_bars": 100,
-        "num_sections": 8,
-        "num_segments": 850,
-        "class_label": 1
-    }
-
-@pytest.fixture
-def mock_user():
-    return User(id="test_user", email="test@example.com", created_at="2024-01-01")
-
 
 # Simple test to verify setup works
 class TestBasicFunctionality:
@@ -283,9 +222,9 @@ class TestBasicFunctionality:
         crud.create_song(db, song)
         song_id = sample_song["id"]
         
-        # Multiple users rate
-        crud.create_or_update_user_rating(db, "user1", song_id, 5.0)
-        crud.create_or_update_user_rating(db, "user2", song_id, 3.0)
+        # Multiple users rate; batch into one commit instead of three
+        crud.create_or_update_user_rating(db, "user1", song_id, 5.0, commit=False)
+        crud.create_or_update_user_rating(db, "user2", song_id, 3.0, commit=False)
         crud.create_or_update_user_rating(db, "user3", song_id, 4.0)
         
         # Check average